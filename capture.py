@@ -0,0 +1,185 @@
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from PIL import Image, ImageChops, ImageStat
+
+logger = logging.getLogger(__name__)
+
+THUMB_SIZE = (32, 32)  # Frames are compared on a tiny grayscale thumbnail
+
+
+class CaptureSupervisor:
+    """Runs FFmpeg snapshots for one camera with a hard timeout, failure backoff and frame health checks.
+
+    A capture that hangs is killed after `timeout` seconds. Consecutive failures
+    grow the retry delay up to `max_backoff`. Each saved frame is compared with
+    the previous one to spot frozen streams and checked for near-black images.
+    """
+
+    def __init__(self, camera, rtsp_url, folder, timeout=30, retry_delay=5, max_backoff=300,
+                 stale_threshold=1.0, stale_count=3, black_threshold=8.0, history=100):
+        self.camera = camera
+        self.rtsp_url = rtsp_url
+        self.folder = folder
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.max_backoff = max_backoff
+        self.stale_threshold = stale_threshold  # Mean pixel difference below which two frames count as identical
+        self.stale_count = stale_count  # Identical frames in a row before the stream is reported frozen
+        self.black_threshold = black_threshold  # Mean brightness (0-255) below which a frame counts as black
+
+        self._capture_lock = threading.Lock()  # One FFmpeg at a time per camera
+        self._lock = threading.Lock()  # Guards the stats below, never held while FFmpeg runs
+        self._results = deque(maxlen=history)  # True/False per recent attempt
+        self._last_thumb = None
+        self.attempts = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.consecutive_failures = 0
+        self.identical_frames = 0
+        self.black_frames = 0
+        self.last_frame_time = None
+        self.last_error = None
+        self.last_frame_black = False
+
+    def capture(self, prefix="rtsp"):
+        """Grab one frame into the folder. Returns the file path, or None on failure."""
+        with self._capture_lock:
+            if not self.rtsp_url:
+                self._record_failure("RTSP_URL is not set")
+                return None
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filepath = os.path.join(self.folder, f"{prefix}_{timestamp}.jpg")
+            # FFmpeg writes to a name the watcher ignores; it is renamed into place only on success
+            partial_path = filepath + ".part"
+            cmd = [
+                "ffmpeg",
+                "-loglevel", "error",
+                "-rtsp_transport", "tcp",
+                "-y",  # overwrite output
+                "-i", self.rtsp_url,
+                "-ss", "00:00:05",      # < wait seconds after stream starts
+                "-frames:v", "1",       # < grab one frame
+                "-q:v", "2",            # < good JPEG quality
+                "-f", "image2",         # < extension no longer tells FFmpeg the format
+                partial_path
+            ]
+
+            with self._lock:
+                self.attempts += 1
+            # Own process group so a timeout kills FFmpeg and anything it spawned
+            proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, start_new_session=True)
+            try:
+                _, stderr = proc.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                # Stuck decoder: kill it so the next cycle starts from a fresh process
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                proc.communicate()
+                _remove_quietly(partial_path)
+                with self._lock:
+                    self.timeouts += 1
+                self._record_failure(f"FFmpeg timed out after {self.timeout}s")
+                return None
+
+            if proc.returncode != 0 or not os.path.exists(partial_path) or os.path.getsize(partial_path) == 0:
+                _remove_quietly(partial_path)
+                detail = stderr.decode("utf-8", "replace").strip().splitlines()
+                self._record_failure(detail[-1] if detail else f"FFmpeg exited with {proc.returncode}")
+                return None
+
+            os.replace(partial_path, filepath)
+            self._check_frame(filepath)
+            with self._lock:
+                self._results.append(True)
+                self.consecutive_failures = 0
+                self.last_frame_time = time.time()
+                self.last_error = None
+            return filepath
+
+    def _record_failure(self, error):
+        with self._lock:
+            self._results.append(False)
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = error
+        logger.warning("❌ FFmpeg failed to grab snapshot for %s: %s", self.camera, error)
+
+    def _check_frame(self, filepath):
+        # Only called under self._capture_lock, which also guards self._last_thumb
+        try:
+            with Image.open(filepath) as img:
+                img.draft("L", THUMB_SIZE)  # Let the JPEG decoder downscale for us
+                thumb = img.convert("L").resize(THUMB_SIZE)
+        except Exception as e:
+            logger.warning("⚠️ Could not inspect frame %s: %s", filepath, e)
+            return
+
+        black = ImageStat.Stat(thumb).mean[0] < self.black_threshold
+        identical = False
+        if self._last_thumb is not None:
+            diff = ImageStat.Stat(ImageChops.difference(thumb, self._last_thumb)).mean[0]
+            identical = diff < self.stale_threshold
+        self._last_thumb = thumb
+
+        with self._lock:
+            self.last_frame_black = black
+            if black:
+                self.black_frames += 1
+            self.identical_frames = self.identical_frames + 1 if identical else 0
+            identical_frames = self.identical_frames
+        if black:
+            logger.warning("🌑 Black frame from %s: %s", self.camera, filepath)
+        if identical_frames == self.stale_count:
+            logger.warning("🧊 Stream from %s looks frozen (%d identical frames).", self.camera, identical_frames + 1)
+
+    def next_delay(self, refresh_time):
+        """Seconds to wait before the next capture: the normal cycle, or a growing backoff after failures."""
+        if self.consecutive_failures == 0:
+            return refresh_time
+        return min(self.max_backoff, self.retry_delay * 2 ** (self.consecutive_failures - 1))
+
+    def health(self, max_frame_age=None):
+        """Capture stats for the health endpoint. `max_frame_age` marks the camera stale past that many seconds."""
+        with self._lock:
+            recent = list(self._results)
+            age = time.time() - self.last_frame_time if self.last_frame_time else None
+            if self.last_frame_time is None:
+                status = "no_frames" if self.failures else "starting"
+            elif self.consecutive_failures:
+                status = "failing"
+            elif self.identical_frames >= self.stale_count:
+                status = "frozen"
+            elif self.last_frame_black:
+                status = "black"
+            else:
+                status = "ok"
+            if max_frame_age and age is not None and age > max_frame_age:
+                status = "stale"
+            return {
+                "status": status,
+                "success_rate": round(sum(recent) / len(recent), 3) if recent else None,
+                "last_frame_age": round(age, 1) if age is not None else None,
+                "attempts": self.attempts,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "consecutive_failures": self.consecutive_failures,
+                "identical_frames": self.identical_frames,
+                "black_frames": self.black_frames,
+                "last_error": self.last_error,
+            }
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,15 +1,29 @@
 import sqlite3
 import threading
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Lock to prevent concurrent DB writes from different threads
 _db_lock = threading.Lock()
 
 # Path to SQLite DB file (can be overridden via environment variable
 DB_PATH = os.getenv("DB_PATH", "processed_images.db")
 
+# Columns added after the first release, migrated in place by init_db()
+_EXTRA_COLUMNS = {
+    "answer": "TEXT",
+    "confidence": "REAL",
+    "camera": "TEXT",
+    "model": "TEXT",
+    "attempts": "INTEGER",
+    "parse_ok": "INTEGER",
+    "latency_ms": "INTEGER",
+}
+
 def init_db():
-    """Create DB file and processed table if not exists."""
+    """Create DB file, processed and shadow_results tables if not exists."""
     with _db_lock:
         # This will create the DB file if it doesn't exist
         conn = sqlite3.connect(DB_PATH)
@@ -22,19 +36,70 @@ def init_db():
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+            existing = set(row[1] for row in c.execute("PRAGMA table_info(processed)"))
+            for column, column_type in _EXTRA_COLUMNS.items():
+                if column not in existing:
+                    c.execute(f"ALTER TABLE processed ADD COLUMN {column} {column_type}")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_processed_timestamp ON processed(timestamp)")
+            # Verdicts from secondary models, keyed to the same frame as the primary result
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS shadow_results (
+                    filename TEXT,
+                    model TEXT,
+                    result TEXT,
+                    answer TEXT,
+                    confidence REAL,
+                    parse_ok INTEGER,
+                    latency_ms INTEGER,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (filename, model)
+                )
+            """)
+            # WAL lets long exports read while the watcher keeps writing
+            c.execute("PRAGMA journal_mode=WAL")
             conn.commit()
         finally:
             conn.close()
 
-def mark_as_processed(filename, result):
+def mark_as_processed(filename, result, answer=None, confidence=None, camera=None,
+                      model=None, attempts=None, parse_ok=None, latency_ms=None):
     with _db_lock, sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
         c.execute("""
-            INSERT INTO processed(filename, result) VALUES (?, ?)
-            ON CONFLICT(filename) DO UPDATE SET result=excluded.result, timestamp=CURRENT_TIMESTAMP
-        """, (filename, result))
+            INSERT INTO processed(filename, result, answer, confidence, camera, model, attempts, parse_ok, latency_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(filename) DO UPDATE SET result=excluded.result, answer=excluded.answer,
+                confidence=excluded.confidence, camera=excluded.camera, model=excluded.model,
+                attempts=excluded.attempts, parse_ok=excluded.parse_ok, latency_ms=excluded.latency_ms,
+                timestamp=CURRENT_TIMESTAMP
+        """, (filename, result, answer, confidence, camera, model, attempts,
+              None if parse_ok is None else int(parse_ok), latency_ms))
         conn.commit()
 
+def backfill_verdicts(parser, camera, batch_size=500):
+    """Fill answer/confidence/camera for rows written before those columns existed."""
+    updated = 0
+    while True:
+        with _db_lock, sqlite3.connect(DB_PATH) as conn:
+            c = conn.cursor()
+            c.execute("SELECT filename, result FROM processed WHERE answer IS NULL LIMIT ?", (batch_size,))
+            rows = c.fetchall()
+            if not rows:
+                break
+            updates = []
+            for filename, result in rows:
+                answer, confidence = parser(result or "")
+                updates.append((answer, confidence, camera, filename))
+            c.executemany("""
+                UPDATE processed SET answer = ?, confidence = ?, camera = COALESCE(camera, ?)
+                WHERE filename = ?
+            """, updates)
+            conn.commit()
+            updated += len(rows)
+    if updated:
+        logger.info("🔧 Backfilled verdicts for %d existing entries.", updated)
+    return updated
+
 def is_processed(filename):
     with _db_lock, sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
@@ -47,11 +112,155 @@ def load_processed_images():
         c.execute("SELECT filename FROM processed")
         return set(row[0] for row in c.fetchall())
 
-def load_all_results():
+def load_results(filenames, chunk_size=500):
+    """Load (result, timestamp) for the given filenames only."""
+    filenames = list(filenames)
+    results = {}
     with _db_lock, sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
-        c.execute("SELECT filename, result FROM processed")
-        return {row[0]: row[1] for row in c.fetchall()}
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(filenames), chunk_size):
+            chunk = filenames[i:i + chunk_size]
+            placeholders = ','.join(['?' for _ in chunk])
+            c.execute(f"SELECT filename, result, timestamp FROM processed WHERE filename IN ({placeholders})", chunk)
+            for row in c.fetchall():
+                results[row[0]] = (row[1], row[2])
+    return results
+
+def load_verdicts(filenames, chunk_size=500):
+    """Load compact (answer, confidence, timestamp, result) for the given filenames.
+
+    The raw result text is only returned for rows not yet backfilled (answer IS NULL).
+    """
+    filenames = list(filenames)
+    verdicts = {}
+    with _db_lock, sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        for i in range(0, len(filenames), chunk_size):
+            chunk = filenames[i:i + chunk_size]
+            placeholders = ','.join(['?' for _ in chunk])
+            c.execute(f"""
+                SELECT filename, answer, confidence, timestamp, CASE WHEN answer IS NULL THEN result END
+                FROM processed WHERE filename IN ({placeholders})
+            """, chunk)
+            for row in c.fetchall():
+                verdicts[row[0]] = row[1:]
+    return verdicts
+
+def load_filenames_by_answer(answers):
+    """Set of filenames whose verdict is one of answers."""
+    if not answers:
+        return set()
+    with _db_lock, sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        placeholders = ','.join(['?' for _ in answers])
+        c.execute(f"SELECT filename FROM processed WHERE answer IN ({placeholders})", list(answers))
+        return set(row[0] for row in c.fetchall())
+
+def iter_results(start=None, end=None, answers=None, camera=None, chunk_size=1000):
+    """Stream rows of the processed table as dicts, oldest first.
+
+    start/end are 'YYYY-MM-DD HH:MM:SS' strings compared against the processing
+    timestamp (UTC). Uses its own connection and fetchmany() so large exports
+    neither hold the write lock nor load the whole table.
+    """
+    query = "SELECT filename, timestamp, answer, confidence, camera, model, result FROM processed"
+    clauses = []
+    params = []
+    if start:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end:
+        clauses.append("timestamp <= ?")
+        params.append(end)
+    if answers:
+        clauses.append(f"answer IN ({','.join(['?' for _ in answers])})")
+        params.extend(answers)
+    if camera:
+        clauses.append("camera = ?")
+        params.append(camera)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY timestamp, filename"
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        c = conn.cursor()
+        c.execute(query, params)
+        columns = [d[0] for d in c.description]
+        while True:
+            rows = c.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(columns, row))
+    finally:
+        conn.close()
+
+def mark_shadow_result(filename, model, result, answer, confidence, parse_ok, latency_ms):
+    with _db_lock, sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        c.execute("""
+            INSERT INTO shadow_results(filename, model, result, answer, confidence, parse_ok, latency_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(filename, model) DO UPDATE SET result=excluded.result, answer=excluded.answer,
+                confidence=excluded.confidence, parse_ok=excluded.parse_ok, latency_ms=excluded.latency_ms,
+                timestamp=CURRENT_TIMESTAMP
+        """, (filename, model, result, answer, confidence, int(parse_ok), latency_ms))
+        conn.commit()
+
+def shadow_summary():
+    """Per shadow model: frames compared, agreement with the primary verdict and latencies on the same frames.
+
+    Agreement only counts frames where both sides produced a parseable verdict,
+    so two 'unknown' answers don't count as agreeing.
+    """
+    with _db_lock, sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        c.execute("""
+            SELECT model, COUNT(*), SUM(both_ok), SUM(both_ok AND agree), SUM(parse_ok = 0),
+                   AVG(latency_ms), AVG(primary_latency_ms)
+            FROM (
+                -- Rows from before parse_ok existed count as parsed unless the verdict is 'unknown'
+                SELECT s.model, s.parse_ok, s.latency_ms, p.latency_ms AS primary_latency_ms,
+                       s.answer = p.answer AS agree,
+                       s.parse_ok = 1 AND COALESCE(p.parse_ok, p.answer != 'unknown') AS both_ok
+                FROM shadow_results s JOIN processed p ON p.filename = s.filename
+            )
+            GROUP BY model ORDER BY model
+        """)
+        summary = []
+        for model, frames, compared, agreed, failures, latency, primary_latency in c.fetchall():
+            summary.append({
+                "model": model,
+                "frames": frames,
+                "compared": compared or 0,
+                "agreement": round((agreed or 0) / compared, 4) if compared else 0.0,
+                "parse_failures": failures or 0,
+                "avg_latency_ms": round(latency) if latency is not None else None,
+                "primary_avg_latency_ms": round(primary_latency) if primary_latency is not None else None,
+            })
+        return summary
+
+def parse_stats():
+    """Per-model counts of analyzed frames, unparseable verdicts and retries."""
+    with _db_lock, sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        c.execute("""
+            SELECT model, COUNT(*), SUM(parse_ok = 0), SUM(attempts - 1)
+            FROM processed WHERE model IS NOT NULL
+            GROUP BY model ORDER BY model
+        """)
+        stats = []
+        for model, frames, failures, retries in c.fetchall():
+            stats.append({
+                "model": model,
+                "frames": frames,
+                "parse_failures": failures or 0,
+                "retries": retries or 0,
+                "failure_rate": round((failures or 0) / frames, 4) if frames else 0.0,
+            })
+        return stats
 
 def remove_processed_entries(filenames):
     """Remove multiple entries from the processed table."""
@@ -62,12 +271,14 @@ def remove_processed_entries(filenames):
         c = conn.cursor()
         placeholders = ','.join(['?' for _ in filenames])
         c.execute(f"DELETE FROM processed WHERE filename IN ({placeholders})", filenames)
+        c.execute(f"DELETE FROM shadow_results WHERE filename IN ({placeholders})", filenames)
         conn.commit()
-        print(f"🗑️ Removed {len(filenames)} entries from database.")
+        logger.debug("🗑️ Removed %d entries from database.", len(filenames))
 
 def remove_processed_entry(filename):
     """Remove a single entry from the processed table."""
     with _db_lock, sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
         c.execute("DELETE FROM processed WHERE filename = ?", (filename,))
+        c.execute("DELETE FROM shadow_results WHERE filename = ?", (filename,))
         conn.commit()
\ No newline at end of file
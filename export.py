@@ -0,0 +1,178 @@
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime
+from io import StringIO
+
+import db
+
+EXPORT_FIELDS = ["filename", "timestamp", "answer", "confidence", "camera", "model", "result"]
+CHUNK_ROWS = 1000  # Rows formatted per chunk of output
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _chunks(rows, size=CHUNK_ROWS):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_csv(rows):
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for chunk in _chunks(rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+
+
+def iter_ndjson(rows):
+    for chunk in _chunks(rows):
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk)
+
+
+class _StreamSink:
+    """Write-only file object that hands back whatever Parquet wrote since the last drain()."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_parquet(rows):
+    """Stream a Parquet file, one row group per chunk. Requires pyarrow."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("filename", pa.string()),
+        ("timestamp", pa.string()),
+        ("answer", pa.string()),
+        ("confidence", pa.float64()),
+        ("camera", pa.string()),
+        ("model", pa.string()),
+        ("result", pa.string()),
+    ])
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for chunk in _chunks(rows):
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+# format -> (mimetype, file extension, generator)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv", iter_csv),
+    "ndjson": ("application/x-ndjson", "ndjson", iter_ndjson),
+    "parquet": ("application/vnd.apache.parquet", "parquet", iter_parquet),
+}
+
+
+def parse_datetime(value):
+    """Accept 'YYYY-MM-DD', 'YYYY-MM-DDTHH:MM' or any ISO form and return the DB timestamp format."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_answers(values):
+    """Flatten answer filters; 'yesmaybe' expands like on the dashboard."""
+    answers = []
+    for value in values:
+        for answer in value.lower().split(","):
+            answer = answer.strip()
+            if answer == "yesmaybe":
+                answers.extend(["yes", "maybe"])
+            elif answer:
+                answers.append(answer)
+    return answers
+
+
+def export_rows(fmt, start=None, end=None, answers=None, camera=None):
+    """Return a generator of output chunks (str or bytes) for the given format and filters."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == "parquet" and not parquet_available():
+        raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+    rows = db.iter_results(start=start, end=end, answers=answers, camera=camera)
+    return EXPORT_FORMATS[fmt][2](rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export analysis results from the processed table.")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--start", help="Only rows processed at or after this time (ISO, UTC)")
+    parser.add_argument("--end", help="Only rows processed at or before this time (ISO, UTC)")
+    parser.add_argument("--answer", action="append", default=[], help="yes, no, maybe, unknown or yesmaybe; repeatable")
+    parser.add_argument("--camera", help="Only rows for this camera name")
+    parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+    db.init_db()  # Make sure older DB files have the export columns
+
+    try:
+        chunks = export_rows(
+            args.format,
+            start=parse_datetime(args.start),
+            end=parse_datetime(args.end),
+            answers=parse_answers(args.answer),
+            camera=args.camera,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    binary = args.format == "parquet"
+    if args.output:
+        out = open(args.output, "wb") if binary else open(args.output, "w", newline="")
+    else:
+        out = sys.stdout.buffer if binary else sys.stdout
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
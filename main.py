@@ -1,26 +1,30 @@
 import os
 import time
 import threading
-import base64
+import queue
+import random
 import requests
 import json
 import db
+import recovery
+import preprocess
+import export
 import re
-import sys
 import logging
-import subprocess
+import logs
+import capture
 from threading import Lock
-from flask import Flask, render_template_string, send_from_directory, redirect, request
-from PIL import Image
-from io import BytesIO
+from flask import Flask, Response, render_template_string, send_from_directory, redirect, request
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-sys.stdout.reconfigure(line_buffering=True)
+from result_cache import ResultCache
+
+load_dotenv()
+logger = logging.getLogger("main")
 
 log = logging.getLogger('werkzeug')
 log.setLevel(logging.ERROR)
 
-load_dotenv()
 BASE_URL = os.getenv("BASE_URL", "http://localhost:9822")  # Base URL for image links
 EXTERNAL_URL = os.getenv("EXTERNAL_URL", "")  # Optional external URL for reverse proxy
 FOLDER_PATH    = os.getenv("FOLDER_PATH", "./images")
@@ -34,32 +38,84 @@ OLLAMA_TOP_P = float(os.getenv("OLLAMA_TOP_P", "0.9"))
 OLLAMA_SEED = int(os.getenv("OLLAMA_SEED", "42"))
 CLEANUP_INTERVAL = 1 * 60 * 60  # Run cleanup every 24 hours (in seconds)
 IMAGE_RETENTION_DAYS = int(os.getenv("IMAGE_RETENTION_DAYS", "15"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "5000"))  # Max results kept in memory
+RECOVERY_FULL_COUNT = int(os.getenv("RECOVERY_FULL_COUNT", "0"))  # Newest pending frames always analyzed on startup (0 = all)
+RECOVERY_SAMPLE_EVERY = int(os.getenv("RECOVERY_SAMPLE_EVERY", "10"))  # Beyond that, analyze 1 in N older frames
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))  # Give up on a frame after this many failed analyses
+RETRY_DELAY = int(os.getenv("RETRY_DELAY", "30"))  # First retry delay for a failed frame, doubled each time (seconds)
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "2"))  # Image preprocessing processes (0 = inline)
+CAPTURE_TIMEOUT = int(os.getenv("CAPTURE_TIMEOUT", "30"))  # Kill FFmpeg if a snapshot takes longer (seconds)
+CAPTURE_RETRY_DELAY = int(os.getenv("CAPTURE_RETRY_DELAY", "5"))  # First retry delay after a failed capture, doubled each time
+CAPTURE_MAX_BACKOFF = int(os.getenv("CAPTURE_MAX_BACKOFF", "300"))  # Upper bound for the retry delay
+CAPTURE_STALE_AFTER = int(os.getenv("CAPTURE_STALE_AFTER", str(3 * (REFRESH_TIME + 5))))  # Alert when the last frame is older (seconds)
+OLLAMA_PRELOAD = os.getenv("OLLAMA_PRELOAD", "true").lower() in ("1", "true", "yes")  # Load the model into memory at startup
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "")  # How long Ollama keeps the model loaded, e.g. "24h" or "-1"
+OLLAMA_STRUCTURED = os.getenv("OLLAMA_STRUCTURED", "false").lower() in ("1", "true", "yes")  # Constrain output to RESPONSE_SCHEMA
+OLLAMA_MAX_RETRIES = int(os.getenv("OLLAMA_MAX_RETRIES", "2"))  # Extra attempts when structured output is malformed
+
+# JSON schema passed as Ollama's `format` in structured mode
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "answer": {"type": "string", "enum": ["yes", "no", "maybe"]},
+        "confidence": {"type": "integer", "minimum": 0, "maximum": 100},
+    },
+    "required": ["answer", "confidence"],
+}
+SHADOW_MODELS = [m.strip() for m in os.getenv("SHADOW_MODELS", "").split(",") if m.strip()]  # Secondary models to compare against
+SHADOW_FRACTION = float(os.getenv("SHADOW_FRACTION", "0.1"))  # Share of live frames also sent to the shadow models
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "20"))  # Pending shadow frames; extra ones are dropped
+SHADOW_KEEP_ALIVE = os.getenv("SHADOW_KEEP_ALIVE", "0")  # Unload shadow models right after use so the primary stays in VRAM
+STRUCTURED_PROMPT_SUFFIX = ' Respond in JSON with "answer" (yes, no or maybe) and "confidence" (integer from 0 to 100).'
 
 app = Flask(__name__)
-analysis_results = {}  # Cache of filename -> result string
 request_lock = Lock()
-
-db.init_db()  # Initialize your SQLite DB on startup
-
-print(f"✅ Using model: {OLLAMA_MODEL}")
-
-# Convert image file to base64 for LLaVA API
-def encode_image_to_base64(path):
-    with Image.open(path) as img:
-        buffer = BytesIO()
-        img.convert("RGB").save(buffer, format="JPEG")
-        return base64.b64encode(buffer.getvalue()).decode("utf-8")
+preprocess_pool = preprocess.PreprocessPool(PREPROCESS_WORKERS)
+inference_queue = queue.PriorityQueue()  # (-mtime, filename, Future of base64 payload, slots) ready for the model
+inflight_frames = set()  # Frames handed to the pipeline but not yet recorded
+inflight_lock = Lock()
+shadow_queue = queue.Queue(maxsize=SHADOW_QUEUE_SIZE)  # (filename, base64 payload) for the shadow models
+primary_pending = 0  # analyze_image() calls in progress, including manual /analyze; shadow runs wait for 0
+primary_pending_lock = Lock()
+
+# Startup progress reported by /healthz; filled in by start() and startup_tasks()
+readiness = {
+    "db": False,
+    "cleanup": False,
+    "recovery": False,
+    "model": "disabled",
+}
+readiness_lock = Lock()
+
+def set_ready(component, value=True):
+    with readiness_lock:
+        readiness[component] = value
+
+def keep_alive_value(value):
+    """Ollama parses string keep_alive as a Go duration ("24h"); bare numbers like "-1" or "3600" must be sent as ints."""
+    value = str(value).strip()
+    return int(value) if value.lstrip("-").isdigit() else value
 
 # Send image and prompt to LLaVA server, stream and collect respons
-def ask_llava_stream(image_b64, prompt):
+def ask_llava_stream(image_b64, prompt, model=None, response_format=None, seed=None, keep_alive=None, timings=None):
     payload = {
-        "model": OLLAMA_MODEL,
+        "model": model or OLLAMA_MODEL,
         "prompt": prompt,
         "images": [image_b64],
-        "temperature": OLLAMA_TEMPERATURE,
-        "top_p": OLLAMA_TOP_P,
-        "seed": OLLAMA_SEED,
+        # Ollama only reads sampling settings from "options"
+        "options": {
+            "temperature": OLLAMA_TEMPERATURE,
+            "top_p": OLLAMA_TOP_P,
+            "seed": OLLAMA_SEED if seed is None else seed,
+        },
     }
+    if response_format is not None:
+        payload["format"] = response_format
+    # Ollama applies keep_alive per request, so it has to ride along on every call
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive_value(keep_alive)
+    elif OLLAMA_KEEP_ALIVE and payload["model"] == OLLAMA_MODEL:
+        payload["keep_alive"] = keep_alive_value(OLLAMA_KEEP_ALIVE)
     response = requests.post(
         OLLAMA_URL,
         json=payload,
@@ -72,25 +128,64 @@ def ask_llava_stream(image_b64, prompt):
             data = json.loads(line.decode("utf-8"))
             full_response += data.get("response", "")
             if data.get("done", False):
+                # Server-side durations (ns), summed over calls when a dict is passed in
+                if timings is not None:
+                    for key in ("total_duration", "load_duration"):
+                        if key in data:
+                            timings[key] = timings.get(key, 0) + data[key]
                 break
     return full_response
 
-# Home page: list all images with results and forms
-import re
-from datetime import datetime
+def inference_ms(timings, wall_ms):
+    """Model time without any model (re)load, so latencies compare fairly; wall time if Ollama gave no durations."""
+    if "total_duration" not in timings:
+        return wall_ms
+    return int((timings["total_duration"] - timings.get("load_duration", 0)) / 1e6)
 
-def extract_answer(text):
+# Ask the model for a verdict, retrying a bounded number of times on malformed structured output
+def ask_for_verdict(image_b64, model=None, keep_alive=None, timings=None):
     """
-    Extract the answer from AI response text using the same logic as parse_response.
+    Returns:
+        (response, answer, confidence, attempts, parse_ok)
+    In legacy mode a single call is parsed with the regex and never retried.
     """
-    if not text:
-        return "unknown"
-    # Use the same regex as parse_response to find "answer = confidence" format
-    match = re.search(r"\b(yes|no|maybe)\s*=\s*(\d+)", text, re.IGNORECASE)
-    if match:
-        return match.group(1).lower()
-    # If no confidence format found, return unknown
-    return "unknown"
+    if not OLLAMA_STRUCTURED:
+        response = ask_llava_stream(image_b64, PROMPT, model=model, keep_alive=keep_alive, timings=timings)
+        answer, confidence = parse_response(response)
+        return response, answer, confidence, 1, answer != "unknown"
+
+    response = ""
+    for attempt in range(1, OLLAMA_MAX_RETRIES + 2):
+        # A fixed seed would give the same bad output again, so vary it per retry
+        response = ask_llava_stream(image_b64, PROMPT + STRUCTURED_PROMPT_SUFFIX, model=model,
+                                    response_format=RESPONSE_SCHEMA, seed=OLLAMA_SEED + attempt - 1,
+                                    keep_alive=keep_alive, timings=timings)
+        try:
+            answer, confidence = parse_structured(response)
+            return response, answer, confidence, attempt, True
+        except ValueError as e:
+            logger.warning("⚠️ Malformed structured output from %s (attempt %d): %s", model or OLLAMA_MODEL, attempt, e)
+    return response, "unknown", 0.0, OLLAMA_MAX_RETRIES + 1, False
+
+# Ask Ollama to load the model now so the first frame doesn't pay for it
+def preload_model():
+    payload = {"model": OLLAMA_MODEL}
+    if OLLAMA_KEEP_ALIVE:
+        payload["keep_alive"] = keep_alive_value(OLLAMA_KEEP_ALIVE)
+    set_ready("model", "loading")
+    try:
+        # No prompt: Ollama only loads the model and returns
+        response = requests.post(OLLAMA_URL, json=payload, timeout=600)
+        response.raise_for_status()
+        set_ready("model", "loaded")
+        logger.info("🔥 Model %s loaded.", OLLAMA_MODEL)
+    except Exception as e:
+        set_ready("model", "failed")
+        logger.warning("⚠️ Could not preload model %s: %s", OLLAMA_MODEL, e)
+
+# Home page: list all images with results and forms
+import re
+from datetime import datetime
 
 @app.route("/")
 def index():
@@ -103,10 +198,6 @@ def index():
         reverse=True
     )
 
-    if not analysis_results:
-        for filename, result in db.load_all_results().items():
-            analysis_results[filename] = result
-
     filter_answer = request.args.get("answer", "").lower()
 
     if filter_answer == "yesmaybe":
@@ -129,12 +220,16 @@ def index():
     except ValueError:
         pass
 
+    # Answer filtering runs in SQL on the verdict column; files never analyzed count as unknown
+    if filter_answers:
+        matching = db.load_filenames_by_answer(filter_answers)
+        if "unknown" in filter_answers:
+            matching |= set(all_files) - db.load_processed_images()
+
     filtered_files = []
     for f in all_files:
-        result = analysis_results.get(f, "")
-        answer = extract_answer(result)
         # Filter by answer list
-        if filter_answers and answer not in filter_answers:
+        if filter_answers and f not in matching:
             continue
         file_path = os.path.join(FOLDER_PATH, f)
         file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
@@ -150,11 +245,19 @@ def index():
     end = start + per_page
     files = filtered_files[start:end]
 
+    # Verdicts come from the in-memory cache; raw AI text is fetched once, for this page's cards only
+    records = result_cache.get_many(files)
+    results = {f: result for f, (result, _) in db.load_results([f for f in files if f in records]).items()}
+
+    shadow_summary = db.shadow_summary() if SHADOW_MODELS else []
+
     return render_template_string(
         TEMPLATE,
+        shadow_summary=shadow_summary,
         files=files,
         camera_name=CAMERA_NAME,
-        results=analysis_results,
+        records=records,
+        results=results,
         prompt=PROMPT,
         model=OLLAMA_MODEL,
         page=page,
@@ -171,21 +274,31 @@ def index():
 def image_file(filename):
     return send_from_directory(FOLDER_PATH, filename)
 
+# Stream results out of the DB as CSV, NDJSON or Parquet
+@app.route("/export")
+def export_results():
+    fmt = request.args.get("format", "csv").lower()
+    try:
+        chunks = export.export_rows(
+            fmt,
+            start=export.parse_datetime(request.args.get("start")),
+            end=export.parse_datetime(request.args.get("end")),
+            answers=export.parse_answers(request.args.getlist("answer")),
+            camera=request.args.get("camera") or None,
+        )
+    except ValueError as e:
+        return str(e), 400
+    mimetype, extension, _ = export.EXPORT_FORMATS[fmt]
+    filename = f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return Response(chunks, mimetype=mimetype, headers={"Content-Disposition": f"attachment; filename={filename}"})
+
 # Trigger analysis of selected image when form is submitted
 @app.route("/analyze/<filename>", methods=["POST"])
 def analyze(filename):
-    filepath = os.path.join(FOLDER_PATH, filename)
     try:
-        image_b64 = encode_image_to_base64(filepath)
-        with request_lock:
-            response = ask_llava_stream(image_b64, PROMPT)
-            print(f"🤖 AI result for {filename}: {response}")
-        analysis_results[filename] = response
-        db.mark_as_processed(filename, response)
-        answer, confidence = parse_response(response)
-        send_to_influx(answer, confidence, filename)  # Pass filename here
+        analyze_image(filename)
     except Exception as e:
-        analysis_results[filename] = f"Error: {e}"
+        result_cache.put_error(filename, e)
     return redirect("/")
 
 @app.route("/snapshot/control", methods=["POST"])
@@ -194,12 +307,12 @@ def control_snapshot():
     action = request.form.get("action")
     if action == "stop":
         snapshot_loop_enabled = False
-        print("⏹ Snapshot loop stopped.")
+        logger.info("⏹ Snapshot loop stopped.")
     elif action == "start":
         snapshot_loop_enabled = True
-        print("▶️ Snapshot loop started.")
+        logger.info("▶️ Snapshot loop started.")
     elif action == "once":
-        print("📸 Doing one manual snapshot...")
+        logger.info("📸 Doing one manual snapshot...")
         do_one_snapshot()
     return redirect("/")
 
@@ -208,69 +321,70 @@ snapshot_loop_enabled = True
 snapshot_thread = None
 snapshot_lock = Lock()
 
+capture_supervisor = capture.CaptureSupervisor(
+    CAMERA_NAME, os.getenv("RTSP_URL"), FOLDER_PATH,
+    timeout=CAPTURE_TIMEOUT,
+    retry_delay=CAPTURE_RETRY_DELAY,
+    max_backoff=CAPTURE_MAX_BACKOFF,
+)
+
 def rtsp_snapshotter():
     global snapshot_loop_enabled
 
-    rtsp_url = os.getenv("RTSP_URL")
-    print(f"📸 Preparing RTSP snapshots via FFmpeg")
+    logger.info("📸 Preparing RTSP snapshots via FFmpeg")
 
     while True:
         if not snapshot_loop_enabled:
             time.sleep(1)
             continue
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"rtsp_{timestamp}.jpg"
-        filepath = os.path.join(FOLDER_PATH, filename)
+        logger.debug("📡 Taking snapshot...")
+        filepath = capture_supervisor.capture()
+        if filepath:
+            logger.debug("✅ Snapshot saved via FFmpeg: %s", filepath)
 
-        cmd = [
-            "ffmpeg",
-            "-rtsp_transport", "tcp",
-            "-y",  # overwrite output
-            "-i", rtsp_url,
-            "-ss", "00:00:05",      # < wait seconds after stream starts
-            "-frames:v", "1",       # < grab one frame
-            "-q:v", "2",            # < good JPEG quality
-            filepath
-        ]
-
-        print(f"📡 Taking snapshot to {filepath}...")
-        try:
-            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-            print(f"✅ Snapshot saved via FFmpeg: {filepath}")
-        except subprocess.CalledProcessError:
-            print("❌ FFmpeg failed to grab snapshot.")
+        # Watchdog: shout when no good frame has arrived for a while
+        health = capture_supervisor.health(max_frame_age=CAPTURE_STALE_AFTER)
+        if health["status"] != "ok":
+            logger.warning("🚨 Capture for %s is %s (last frame age: %s s, success rate: %s)",
+                           CAMERA_NAME, health["status"], health["last_frame_age"], health["success_rate"])
 
-        print("🕒 Waiting for next capture cycle...")
-        time.sleep(REFRESH_TIME)
+        logger.debug("🕒 Waiting for next capture cycle...")
+        time.sleep(capture_supervisor.next_delay(REFRESH_TIME))
 
 def do_one_snapshot():
-    rtsp_url = os.getenv("RTSP_URL")
-    if not rtsp_url:
-        print("❌ RTSP_URL is not set.")
-        return
+    logger.info("📸 Taking manual snapshot...")
+    filepath = capture_supervisor.capture()
+    if filepath:
+        logger.info("✅ Manual snapshot saved: %s", filepath)
+
+# Readiness probe: 200 once the DB is up and the backlog is being worked on
+@app.route("/healthz")
+def healthz():
+    with readiness_lock:
+        components = dict(readiness)
+    ready = components["db"] and components["recovery"]
+    body = {
+        "ready": ready,
+        "components": components,
+        "capture": {CAMERA_NAME: capture_supervisor.health(max_frame_age=CAPTURE_STALE_AFTER)},
+    }
+    return body, 200 if ready else 503
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"rtsp_{timestamp}.jpg"
-    filepath = os.path.join(FOLDER_PATH, filename)
-
-    cmd = [
-        "ffmpeg",
-        "-rtsp_transport", "tcp",
-        "-y",  # overwrite output
-        "-i", rtsp_url,
-        "-ss", "00:00:05",      # < wait seconds after stream starts
-        "-frames:v", "1",       # < grab one frame
-        "-q:v", "2",            # < good JPEG quality
-        filepath
-    ]
-
-    print(f"📸 Taking manual snapshot to {filepath}...")
-    try:
-        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        print(f"✅ Manual snapshot saved: {filepath}")
-    except subprocess.CalledProcessError:
-        print("❌ FFmpeg failed to capture snapshot.")
+# Agreement and latency of each shadow model against the primary one
+@app.route("/shadow")
+def shadow_stats():
+    return {"primary": OLLAMA_MODEL, "shadow_models": SHADOW_MODELS, "summary": db.shadow_summary()}
+
+# Per-model share of responses that could not be parsed into a verdict
+@app.route("/stats/parse")
+def parse_stats():
+    return {"models": db.parse_stats()}
+
+# Per-camera capture success rate and last-frame age
+@app.route("/capture/health")
+def capture_health():
+    return {CAMERA_NAME: capture_supervisor.health(max_frame_age=CAPTURE_STALE_AFTER)}
 
 # Add manual cleanup route
 @app.route("/cleanup", methods=["POST"])
@@ -280,77 +394,166 @@ def manual_cleanup():
         cleanup_old_images()
         return redirect("/?message=cleanup_completed")
     except Exception as e:
-        print(f"❌ Manual cleanup failed: {e}")
+        logger.error("❌ Manual cleanup failed: %s", e)
         return redirect("/?message=cleanup_failed")
 
 # Background thread to watch folder for new unprocessed files
+# Frames older than this are about to be removed by cleanup; don't spend the model on them
+def retention_cutoff():
+    return time.time() - (IMAGE_RETENTION_DAYS * 24 * 60 * 60)
+
 def folder_watcher():
-    print(f"👁️ Watching folder: {FOLDER_PATH}")
+    logger.info("👁️ Watching folder: %s", FOLDER_PATH)
     processed = set(db.load_processed_images())
-    # Check latest file on startup
-    latest = get_latest_image()
-    if latest and latest not in processed:
-        try:
-            image_b64 = encode_image_to_base64(os.path.join(FOLDER_PATH, latest))
-            with request_lock:
-                response = ask_llava_stream(image_b64, PROMPT)
-                print(f"🤖 AI result for {latest}: {response}")  # Fixed variable name
-            analysis_results[latest] = response
-            db.mark_as_processed(latest, response)
-            answer, confidence = parse_response(response)
-            send_to_influx(answer, confidence, latest)  # Pass filename here
-            processed.add(latest)
-        except Exception as e:
-            analysis_results[latest] = f"Error: {e}"
+    # One DB-vs-folder diff on startup, queued newest-first so the live feed is fresh first
+    planned, skipped = recovery.plan_recovery(
+        FOLDER_PATH, processed,
+        full_count=RECOVERY_FULL_COUNT,
+        sample_every=RECOVERY_SAMPLE_EVERY,
+        min_mtime=retention_cutoff(),
+    )
+    backlog = recovery.BacklogQueue(planned)
+    retries = recovery.RetryTracker(max_attempts=RETRY_MAX_ATTEMPTS, retry_delay=RETRY_DELAY)
+    logger.info("♻️ Recovery: %d frames queued newest-first, %d older frames sampled out.", len(planned), len(skipped))
+    threading.Thread(target=inference_worker, args=(processed, retries), daemon=True).start()
+    set_ready("recovery")
+    # Keep just enough frames in preprocessing to feed the model; the rest wait in the backlog
+    inflight_slots = threading.Semaphore(max(2, PREPROCESS_WORKERS * 2))
     # Monitor folder continuously
     while True:
-        for filename in os.listdir(FOLDER_PATH):
-            if not filename.lower().endswith((".jpg", ".jpeg", ".png")):
+        filename = None
+        try:
+            # New frames land in the same queue and overtake the older backlog
+            with inflight_lock:
+                busy = set(inflight_frames)
+            # Failed frames stay out until their retry is due, so they can't hog the front of the queue
+            for mtime, name in recovery.scan_unprocessed(FOLDER_PATH, processed, skipped, backlog, busy, retries,
+                                                         min_mtime=retention_cutoff()):
+                backlog.push(name, mtime)
+            item = backlog.pop()
+            if item is None:
+                time.sleep(5)
                 continue
-            if filename in processed:
+            mtime, name = item
+            inflight_slots.acquire()
+            filename = name
+            with inflight_lock:
+                inflight_frames.add(filename)
+            future = preprocess_pool.submit(os.path.join(FOLDER_PATH, filename))
+            # Ready frames are still handed to the model newest-first
+            future.add_done_callback(lambda f, m=mtime, name=filename: inference_queue.put((-m, name, f, inflight_slots)))
+        except Exception as e:
+            # Keep watching no matter what; a dropped frame is found again on the next scan
+            logger.exception("❌ Folder watcher error: %s", e)
+            if filename is not None:
+                with inflight_lock:
+                    inflight_frames.discard(filename)
+                inflight_slots.release()
+            time.sleep(5)
+
+# Background thread feeding preprocessed frames to the model one at a time
+def inference_worker(processed, retries):
+    while True:
+        _, filename, future, inflight_slots = inference_queue.get()
+        try:
+            try:
+                image_b64 = future.result()
+            except Exception as e:
+                # Unreadable image: no point waiting on the model
+                fail_frame(filename, e, retries)
                 continue
             try:
-                image_b64 = encode_image_to_base64(os.path.join(FOLDER_PATH, filename))
-                with request_lock:
-                    response = ask_llava_stream(image_b64, PROMPT)
-                    print(f"🤖 AI result for {filename}: {response}")
-                analysis_results[filename] = response
-                db.mark_as_processed(filename, response)
-                answer, confidence = parse_response(response)
-                send_to_influx(answer, confidence, filename)  # Pass filename here
+                analyze_image(filename, image_b64)
                 processed.add(filename)
+                retries.record_success(filename)
             except Exception as e:
-                analysis_results[filename] = f"Error: {e}"
-        time.sleep(5)
-
-# Get the most recently modified image file
-def get_latest_image():
-    files = [
-        f for f in os.listdir(FOLDER_PATH)
-        if f.lower().endswith((".jpg", ".jpeg", ".png"))
-    ]
-
-    if not files:
-        return None
+                fail_frame(filename, e, retries)
+                time.sleep(5)  # Model or network trouble: don't hammer it
+        finally:
+            with inflight_lock:
+                inflight_frames.discard(filename)
+            inflight_slots.release()
+
+def fail_frame(filename, error, retries):
+    result_cache.put_error(filename, error)
+    if retries.record_failure(filename):
+        logger.warning("❌ Analysis failed for %s, will retry: %s", filename, error)
+    else:
+        logger.error("❌ Giving up on %s after %d attempts: %s", filename, retries.max_attempts, error)
 
-    def safe_mtime(filename):
+# Run one image through the model and record the result everywhere
+def analyze_image(filename, image_b64=None):
+    global primary_pending
+    with primary_pending_lock:
+        primary_pending += 1
+    try:
+        if image_b64 is None:
+            image_b64 = preprocess_pool.encode(os.path.join(FOLDER_PATH, filename))
+        timings = {}
+        with request_lock:
+            started = time.monotonic()
+            response, answer, confidence, attempts, parse_ok = ask_for_verdict(image_b64, timings=timings)
+            latency_ms = inference_ms(timings, int((time.monotonic() - started) * 1000))
+            logger.debug("🤖 Raw AI response for %s: %s", filename, response)
+    finally:
+        with primary_pending_lock:
+            primary_pending -= 1
+    db.mark_as_processed(filename, response, answer=answer, confidence=confidence, camera=CAMERA_NAME,
+                         model=OLLAMA_MODEL, attempts=attempts, parse_ok=parse_ok, latency_ms=latency_ms)
+    record = result_cache.put(filename, answer, confidence)
+    logger.info("🤖 AI result for %s: %s (%.2f)", filename, answer, confidence,
+                extra={"image": filename, "answer": answer, "confidence": confidence})
+    send_to_influx(answer, confidence, filename)  # Pass filename here
+    if SHADOW_MODELS and random.random() < SHADOW_FRACTION:
         try:
-            return os.path.getmtime(os.path.join(FOLDER_PATH, filename))
-        except FileNotFoundError:
-            return 0  # file vanished
-
-    files = sorted(files, key=safe_mtime, reverse=True)
-    return files[0]
+            shadow_queue.put_nowait((filename, image_b64))
+        except queue.Full:
+            logger.debug("👥 Shadow queue full, skipping %s", filename)
+    return record
+
+def primary_busy():
+    """True while any frame is on its way to, or inside, the primary model."""
+    with inflight_lock:
+        if inflight_frames:
+            return True
+    with primary_pending_lock:
+        return primary_pending > 0 or not inference_queue.empty()
+
+# Background thread running sampled frames through the shadow models when the GPU is idle
+def shadow_worker():
+    logger.info("👥 Shadow models: %s (%.0f%% of frames)", ", ".join(SHADOW_MODELS), SHADOW_FRACTION * 100)
+    while True:
+        filename, image_b64 = shadow_queue.get()
+        for model in SHADOW_MODELS:
+            # Low priority: let every frame being preprocessed, queued or analyzed for the primary go first
+            while primary_busy():
+                time.sleep(1)
+            try:
+                timings = {}
+                with request_lock:
+                    started = time.monotonic()
+                    response, answer, confidence, _, parse_ok = ask_for_verdict(
+                        image_b64, model=model, keep_alive=SHADOW_KEEP_ALIVE, timings=timings)
+                    latency_ms = inference_ms(timings, int((time.monotonic() - started) * 1000))
+                db.mark_shadow_result(filename, model, response, answer, confidence, parse_ok, latency_ms)
+                logger.debug("👥 Shadow %s for %s: %s (%.2f) in %d ms", model, filename, answer, confidence, latency_ms)
+            except Exception as e:
+                logger.warning("❌ Shadow model %s failed for %s: %s", model, filename, e)
 
 #look for the answer from the AI
 def parse_response(response):
     """
     Parse responses like 'Yes = 65', 'No=10', 'Maybe = 50'
-    Only accepts '=' as separator.
+    Only accepts '=' as separator. Structured JSON responses are parsed with parse_structured().
     Returns:
         answer: str ('yes', 'no', 'maybe')
         confidence: float (0.0 to 1.0)
     """
+    if response.lstrip().startswith("{"):
+        try:
+            return parse_structured(response)
+        except ValueError:
+            pass
     match = re.search(r"\b(yes|no|maybe)\b\s*=\s*(\d+)", response, re.IGNORECASE)
     if not match:
         return "unknown", 0.0
@@ -359,6 +562,31 @@ def parse_response(response):
     confidence = min(max(confidence, 0), 100) / 100.0
     return answer, confidence
 
+def parse_structured(response):
+    """
+    Strictly parse a structured response like '{"answer": "yes", "confidence": 65}'.
+    Raises ValueError if it doesn't match RESPONSE_SCHEMA.
+    Returns:
+        answer: str ('yes', 'no', 'maybe')
+        confidence: float (0.0 to 1.0)
+    """
+    try:
+        data = json.loads(response)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"not valid JSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("not a JSON object")
+    answer = data.get("answer")
+    confidence = data.get("confidence")
+    if not isinstance(answer, str) or answer.lower() not in ("yes", "no", "maybe"):
+        raise ValueError(f"invalid answer: {answer!r}")
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 <= confidence <= 100:
+        raise ValueError(f"invalid confidence: {confidence!r}")
+    return answer.lower(), confidence / 100.0
+
+# Bounded cache of compact verdicts; raw text stays in the DB until a card is rendered
+result_cache = ResultCache(db.load_verdicts, parse_response, max_entries=RESULT_CACHE_SIZE)
+
 #InfluxDB send information
 def _escape_tag(v: str) -> str:
     # Escape for tag values: comma, space, equals
@@ -395,7 +623,7 @@ def send_to_influx(answer, confidence, filename=None, ts_ns=None):
     source = os.getenv("OLLAMA_MODEL", "unknown")
 
     if not influx_url:
-        print("⚠️ INFLUX_URL not configured, skipping InfluxDB write")
+        logger.warning("⚠️ INFLUX_URL not configured, skipping InfluxDB write")
         return
 
     # Determine the base URL to use (from your existing context)
@@ -433,7 +661,7 @@ def send_to_influx(answer, confidence, filename=None, ts_ns=None):
     field_str = ",".join(field_parts)
 
     if not field_str:
-        print("⚠️ No fields to write, skipping")
+        logger.warning("⚠️ No fields to write, skipping")
         return
 
     # Optional timestamp in nanoseconds; if not provided, server will assign
@@ -452,23 +680,23 @@ def send_to_influx(answer, confidence, filename=None, ts_ns=None):
     try:
         resp = requests.post(influx_url, params=params, data=line, auth=auth, timeout=5)
         if resp.status_code == 204:
-            print(f"📤 Sent answer with confidence={confidence:.2f} to InfluxDB.")
+            logger.debug("📤 Sent answer with confidence=%.2f to InfluxDB.", confidence)
             if image_link:
-                print(f"🔗 Image link: {image_link}")
+                logger.debug("🔗 Image link: %s", image_link)
         else:
-            print(f"⚠️ InfluxDB write failed: {resp.status_code} {resp.text}")
+            logger.warning("⚠️ InfluxDB write failed: %s %s", resp.status_code, resp.text)
             # Helpful for debugging cardinality/limits:
-            # print(f"Line protocol was: {line}")
+            # logger.debug("Line protocol was: %s", line)
     except Exception as e:
-        print(f"❌ InfluxDB error: {e}")
+        logger.error("❌ InfluxDB error: %s", e)
 
 def cleanup_old_images():
     """Remove images older than IMAGE_RETENTION_DAYS and update database accordingly."""
-    print(f"🧹 Starting cleanup of images older than {IMAGE_RETENTION_DAYS} days...")
+    logger.info("🧹 Starting cleanup of images older than %d days...", IMAGE_RETENTION_DAYS)
     
     if not os.path.exists(FOLDER_PATH):
-        print(f"❌ Folder {FOLDER_PATH} does not exist.")
-        return
+        logger.error("❌ Folder %s does not exist.", FOLDER_PATH)
+    cutoff_time = retention_cutoff()
     cutoff_time = time.time() - (IMAGE_RETENTION_DAYS * 24 * 60 * 60)
     removed_count = 0
     # Get all image files in the folder
@@ -481,22 +709,21 @@ def cleanup_old_images():
             if os.path.getmtime(filepath) < cutoff_time:
                 os.remove(filepath)
                 # Remove from in-memory cache as well
-                if filename in analysis_results:
-                    del analysis_results[filename]
+                result_cache.discard([filename])
                 removed_count += 1
-                print(f"🗑️ Removed old image: {filename}")
+                logger.debug("🗑️ Removed old image: %s", filename)
         except Exception as e:
-            print(f"❌ Error removing {filename}: {e}")
+            logger.error("❌ Error removing %s: %s", filename, e)
     # Clean up database entries for files that no longer exist
     cleanup_database_entries()
-    print(f"✅ Cleanup completed. Removed {removed_count} old images.")
+    logger.info("✅ Cleanup completed. Removed %d old images.", removed_count)
 
 def cleanup_database_entries():
     """Remove database entries for images that no longer exist in the folder."""
-    print("🔄 Cleaning up database entries for missing images...")
+    logger.debug("🔄 Cleaning up database entries for missing images...")
     
     # Get all filenames from database
-    db_results = db.load_all_results()
+    db_filenames = db.load_processed_images()
     
     # Get all existing image files
     existing_files = set()
@@ -506,7 +733,7 @@ def cleanup_database_entries():
     
     # Find database entries that don't have corresponding files
     orphaned_entries = []
-    for filename in db_results.keys():
+    for filename in db_filenames:
         if filename not in existing_files:
             orphaned_entries.append(filename)
     
@@ -514,32 +741,30 @@ def cleanup_database_entries():
     if orphaned_entries:
         db.remove_processed_entries(orphaned_entries)
         # Also remove from in-memory cache
-        for filename in orphaned_entries:
-            if filename in analysis_results:
-                del analysis_results[filename]
-        print(f"🗑️ Removed {len(orphaned_entries)} orphaned database entries.")
+        result_cache.discard(orphaned_entries)
+        logger.info("🗑️ Removed %d orphaned database entries.", len(orphaned_entries))
     else:
-        print("✅ No orphaned database entries found.")
+        logger.debug("✅ No orphaned database entries found.")
 
-def cleanup_scheduler():
+def cleanup_scheduler(initial_delay=0):
     """Background thread that runs cleanup periodically."""
-    print(f"⏰ Starting cleanup scheduler (runs every {CLEANUP_INTERVAL/3600:.1f} hours)")
-    
+    logger.info("⏰ Starting cleanup scheduler (runs every %.1f hours)", CLEANUP_INTERVAL / 3600)
+    time.sleep(initial_delay)
+
     while True:
         try:
             cleanup_old_images()
         except Exception as e:
-            print(f"❌ Error during scheduled cleanup: {e}")
+            logger.exception("❌ Error during scheduled cleanup: %s", e)
         
         # Wait for next cleanup cycle
         time.sleep(CLEANUP_INTERVAL)
 
-def start_cleanup_scheduler():
+def start_cleanup_scheduler(initial_delay=0):
     """Start the cleanup scheduler in a background thread."""
-    cleanup_thread = threading.Thread(target=cleanup_scheduler, daemon=True)
+    cleanup_thread = threading.Thread(target=cleanup_scheduler, args=(initial_delay,), daemon=True)
     cleanup_thread.start()
-    print("🚀 Cleanup scheduler started.")
-start_cleanup_scheduler()
+    logger.info("🚀 Cleanup scheduler started.")
 
 TEMPLATE = """
 <!DOCTYPE html>
@@ -611,6 +836,22 @@ TEMPLATE = """
         alert('❌ Cleanup failed. Check server logs for details.');
     }
     </script>
+  {% if shadow_summary %}
+  <h2>Shadow Models (vs {{ model }})</h2>
+  <table border="1" cellpadding="4" style="border-collapse: collapse; margin-bottom: 1rem;">
+    <tr><th>Model</th><th>Frames</th><th>Agreement</th><th>Parse failures</th><th>Avg latency</th><th>Primary latency</th></tr>
+    {% for s in shadow_summary %}
+    <tr>
+      <td>{{ s.model }}</td>
+      <td>{{ s.frames }}</td>
+      <td>{{ "%.1f"|format(s.agreement * 100) }}%</td>
+      <td>{{ s.parse_failures }}</td>
+      <td>{{ s.avg_latency_ms if s.avg_latency_ms is not none else "-" }} ms</td>
+      <td>{{ s.primary_avg_latency_ms if s.primary_avg_latency_ms is not none else "-" }} ms</td>
+    </tr>
+    {% endfor %}
+  </table>
+  {% endif %}
   <!--
   <h2>Snapshot Controls</h2>
   <form method="post" action="/snapshot/control"><button name="action" value="start">🔁 Start Loop</button></form>
@@ -646,8 +887,11 @@ TEMPLATE = """
       <form method="post" action="/analyze/{{ file }}">
         <button type="submit">Analyze "{{ file }}"</button>
       </form>
-      {% if results.get(file) %}
-        <div class="result"><strong>Result:</strong><br>{{ results[file] }}</div>
+      {% set record = records.get(file) %}
+      {% if record %}
+        <div class="result"><strong>Result:</strong> {{ record.answer|capitalize }} ({{ (record.confidence * 100)|round|int }}%)
+          <small>{{ record.timestamp.strftime('%Y-%m-%d %H:%M:%S') }}</small><br>
+          {%- if record.error %}Error: {{ record.error }}{% else %}{{ results.get(file, '') }}{% endif %}</div>
       {% endif %}
     </div>
   {% endfor %}
@@ -778,12 +1022,37 @@ def run_http():
 def run_https():
     app.run(host="0.0.0.0", port=9823, ssl_context=('cert.pem', 'key.pem'))
 
-if __name__ == "__main__":
+def startup_tasks():
+    """Heavy maintenance on startup, run in the background next to the watcher."""
+    try:
+        db.backfill_verdicts(parse_response, CAMERA_NAME)
+        logger.info("🧹 Running initial cleanup on startup...")
+        cleanup_old_images()
+        set_ready("cleanup")
+    except Exception as e:
+        set_ready("cleanup", "failed")
+        logger.exception("❌ Initial cleanup failed: %s", e)
+    start_cleanup_scheduler(initial_delay=CLEANUP_INTERVAL)
+
+def start():
+    """Bring the application up: DB and worker processes, then web servers, then background work."""
+    global snapshot_thread
+    logs.setup_logging()
+    logger.info("✅ Using model: %s", OLLAMA_MODEL)
+    preprocess_pool.start()  # Fork workers before the watcher and web threads start
+    db.init_db()  # Initialize your SQLite DB on startup
+    set_ready("db")
+    threading.Thread(target=run_http, daemon=True).start()
+    if OLLAMA_PRELOAD:
+        threading.Thread(target=preload_model, daemon=True).start()
+    # Recovery starts right away; it reports ready on /healthz once its plan is built
     threading.Thread(target=folder_watcher, daemon=True).start()
+    threading.Thread(target=startup_tasks, daemon=True).start()
+    if SHADOW_MODELS:
+        threading.Thread(target=shadow_worker, daemon=True).start()
     snapshot_thread = threading.Thread(target=rtsp_snapshotter, daemon=True)
     snapshot_thread.start()
-    threading.Thread(target=run_http, daemon=True).start()
-    run_https() 
-    start_cleanup_scheduler()
-    print("🧹 Running initial cleanup on startup...")
-    cleanup_old_images()
+
+if __name__ == "__main__":
+    start()
+    run_https()
@@ -0,0 +1,79 @@
+import base64
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+# Convert image file to base64 for LLaVA API
+def encode_image_to_base64(path):
+    with Image.open(path) as img:
+        buffer = BytesIO()
+        img.convert("RGB").save(buffer, format="JPEG")
+        return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+def _warm_up():
+    return True
+
+
+class PreprocessPool:
+    """Runs JPEG decode/re-encode/base64 in worker processes, off the GIL of the web and watcher threads.
+
+    With workers=0 (or before start()) everything runs inline in the caller.
+    If a worker dies (OOM kill, crash in a decoder) the pool is replaced on the next submit().
+    """
+
+    def __init__(self, workers=2):
+        self.workers = max(0, int(workers))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Create the worker processes. Call before starting other threads so they fork from a quiet process."""
+        with self._lock:
+            if self._executor is not None or self.workers == 0:
+                return
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            # The first submit forks every worker up front
+            self._executor.submit(_warm_up).result()
+        logger.info("🧵 Preprocess pool started with %d worker process(es).", self.workers)
+
+    def submit(self, path):
+        """Return a Future resolving to the base64 payload for path."""
+        executor = self._executor
+        if executor is not None:
+            try:
+                return executor.submit(encode_image_to_base64, path)
+            except BrokenProcessPool:
+                executor = self._restart(executor)
+        if executor is None:
+            future = Future()
+            try:
+                future.set_result(encode_image_to_base64(path))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return executor.submit(encode_image_to_base64, path)
+
+    def _restart(self, broken):
+        """Swap a broken executor for a fresh one and return whichever is current."""
+        with self._lock:
+            if self._executor is broken:
+                logger.warning("⚠️ A preprocess worker died, restarting the pool.")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def encode(self, path):
+        return self.submit(path).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
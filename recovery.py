@@ -0,0 +1,138 @@
+import heapq
+import os
+import threading
+import time
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def scan_unprocessed(folder, *known, min_mtime=None):
+    """Single pass over folder returning [(mtime, filename)] for images not in any of the `known` sets.
+
+    Images older than `min_mtime` (past retention, about to be cleaned up) are left out.
+    """
+    pending = []
+    if not os.path.exists(folder):
+        return pending
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            name = entry.name
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            if any(name in k for k in known):
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue  # file vanished
+            if min_mtime is not None and mtime < min_mtime:
+                continue
+            pending.append((mtime, name))
+    return pending
+
+
+def plan_recovery(folder, processed, full_count=0, sample_every=1, min_mtime=None):
+    """Diff the folder against the processed set and plan the backlog newest-first.
+
+    The newest `full_count` frames are all kept. Older frames are only kept one
+    in every `sample_every`, the rest are returned as skipped. A `full_count`
+    of 0 disables sampling and keeps everything. Frames older than `min_mtime`
+    are neither planned nor skipped.
+    Returns (planned, skipped) where planned is [(mtime, filename)] newest-first
+    and skipped is a set of filenames.
+    """
+    pending = scan_unprocessed(folder, processed, min_mtime=min_mtime)
+    pending.sort(reverse=True)
+    if full_count <= 0 or sample_every <= 1:
+        return pending, set()
+
+    planned = pending[:full_count]
+    skipped = set()
+    for i, (mtime, name) in enumerate(pending[full_count:]):
+        if i % sample_every == 0:
+            planned.append((mtime, name))
+        else:
+            skipped.add(name)
+    return planned, skipped
+
+
+class BacklogQueue:
+    """Newest-first queue of frames waiting for analysis."""
+
+    def __init__(self, items=()):
+        self._heap = [(-mtime, name) for mtime, name in items]
+        heapq.heapify(self._heap)
+        self._names = set(name for _, name in self._heap)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
+
+    def __contains__(self, filename):
+        with self._lock:
+            return filename in self._names
+
+    def push(self, filename, mtime):
+        with self._lock:
+            if filename in self._names:
+                return
+            self._names.add(filename)
+            heapq.heappush(self._heap, (-mtime, filename))
+
+    def pop(self):
+        """Return (mtime, filename) for the newest pending frame, or None when the backlog is empty."""
+        with self._lock:
+            if not self._heap:
+                return None
+            neg_mtime, filename = heapq.heappop(self._heap)
+            self._names.discard(filename)
+            return -neg_mtime, filename
+
+
+class RetryTracker:
+    """Failed frames with their retry schedule.
+
+    A failed frame is held back for `retry_delay` seconds, doubling after each
+    further failure, so it can't keep jumping to the front of the backlog.
+    After `max_attempts` failures it is given up on until the next restart.
+    Use it as one of the `known` sets of scan_unprocessed(): a frame counts as
+    known while it waits for its retry or has been given up on.
+    """
+
+    def __init__(self, max_attempts=5, retry_delay=30, max_delay=3600, clock=time.monotonic):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._failures = {}  # filename -> (attempts, retry_at)
+        self._given_up = set()
+        self._lock = threading.Lock()
+
+    def __contains__(self, filename):
+        with self._lock:
+            if filename in self._given_up:
+                return True
+            state = self._failures.get(filename)
+            return state is not None and self._clock() < state[1]
+
+    def record_failure(self, filename):
+        """Count a failure. Returns False once the frame has been given up on."""
+        with self._lock:
+            attempts = self._failures.get(filename, (0, 0))[0] + 1
+            if attempts >= self.max_attempts:
+                self._failures.pop(filename, None)
+                self._given_up.add(filename)
+                return False
+            delay = min(self.max_delay, self.retry_delay * 2 ** (attempts - 1))
+            self._failures[filename] = (attempts, self._clock() + delay)
+            return True
+
+    def record_success(self, filename):
+        with self._lock:
+            self._failures.pop(filename, None)
+
+    @property
+    def given_up(self):
+        with self._lock:
+            return set(self._given_up)
@@ -0,0 +1,108 @@
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+# Compact per-image record kept in memory instead of the raw AI response text
+ResultRecord = namedtuple("ResultRecord", ["answer", "confidence", "timestamp", "error"])
+
+
+class ResultCache:
+    """Thread-safe, size-bounded LRU cache of filename -> ResultRecord.
+
+    Misses are filled from the database through `loader`, which receives a list
+    of filenames and returns {filename: (answer, confidence, timestamp, result_text)}.
+    result_text is only expected when answer is None (rows stored before verdict
+    columns existed); it is parsed with `parser` and then dropped.
+    """
+
+    def __init__(self, loader, parser, max_entries=5000):
+        self._loader = loader
+        self._parser = parser
+        self._max_entries = max(1, int(max_entries))
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
+
+    def _store(self, filename, record):
+        # Caller must hold self._lock
+        self._records[filename] = record
+        self._records.move_to_end(filename)
+        while len(self._records) > self._max_entries:
+            self._records.popitem(last=False)
+
+    def _make_record(self, result, timestamp=None):
+        answer, confidence = self._parser(result or "")
+        return ResultRecord(answer, confidence, timestamp or datetime.now(), None)
+
+    def put(self, filename, answer, confidence, timestamp=None):
+        """Record the verdict of a fresh analysis for filename."""
+        record = ResultRecord(answer, confidence, timestamp or datetime.now(), None)
+        with self._lock:
+            self._store(filename, record)
+        return record
+
+    def put_error(self, filename, error):
+        """Record a failed analysis so the dashboard can show it."""
+        record = ResultRecord("unknown", 0.0, datetime.now(), str(error))
+        with self._lock:
+            self._store(filename, record)
+        return record
+
+    def get(self, filename):
+        return self.get_many([filename]).get(filename)
+
+    def get_many(self, filenames):
+        """Return {filename: ResultRecord} for the given files that have a result.
+
+        Cached entries are served from memory; the rest are loaded from the
+        database in one batch. Files without any result are left out.
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for filename in filenames:
+                record = self._records.get(filename)
+                if record is None:
+                    missing.append(filename)
+                else:
+                    self._records.move_to_end(filename)
+                    found[filename] = record
+        if not missing:
+            return found
+
+        loaded = {}
+        for filename, (answer, confidence, timestamp, result) in self._loader(missing).items():
+            timestamp = _parse_db_timestamp(timestamp)
+            if answer is None:
+                loaded[filename] = self._make_record(result, timestamp)
+            else:
+                loaded[filename] = ResultRecord(answer, confidence or 0.0, timestamp or datetime.now(), None)
+        with self._lock:
+            for filename, record in loaded.items():
+                # A concurrent put() wins over what we just read from the DB
+                if filename not in self._records:
+                    self._store(filename, record)
+                found[filename] = self._records.get(filename, record)
+        return found
+
+    def discard(self, filenames):
+        """Drop entries for files that were removed from disk or the DB."""
+        with self._lock:
+            for filename in filenames:
+                self._records.pop(filename, None)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+def _parse_db_timestamp(value):
+    if isinstance(value, datetime) or value is None:
+        return value
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,62 @@
+import os
+import stat
+import sys
+
+import pytest
+
+import capture
+
+
+def fake_ffmpeg(tmp_path, monkeypatch, script):
+    """Put a fake `ffmpeg` first on PATH. The script receives the output path as $OUT."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    ffmpeg = bin_dir / "ffmpeg"
+    ffmpeg.write_text(f'#!/bin/sh\nfor OUT; do :; done\n{script}\n')
+    ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+def write_jpeg(shade):
+    return (f'{sys.executable} -c "from PIL import Image; '
+            f'Image.new(\'RGB\', (64, 64), ({shade}, {shade}, {shade})).save(\'$OUT\', \'JPEG\')"')
+
+
+@pytest.fixture
+def images(tmp_path):
+    folder = tmp_path / "images"
+    folder.mkdir()
+    return folder
+
+
+def test_success_renames_frame_into_place(tmp_path, images, monkeypatch):
+    fake_ffmpeg(tmp_path, monkeypatch, write_jpeg(120))
+    supervisor = capture.CaptureSupervisor("cam", "rtsp://x", str(images))
+    path = supervisor.capture()
+    assert path and os.path.exists(path)
+    assert os.listdir(images) == [os.path.basename(path)]
+    assert supervisor.health()["status"] == "ok"
+
+
+def test_failure_leaves_no_partial_file(tmp_path, images, monkeypatch):
+    fake_ffmpeg(tmp_path, monkeypatch, 'printf "half" > "$OUT"; echo "Connection reset" >&2; exit 1')
+    supervisor = capture.CaptureSupervisor("cam", "rtsp://x", str(images), retry_delay=5)
+    assert supervisor.capture() is None
+    assert os.listdir(images) == []
+    assert supervisor.health()["last_error"] == "Connection reset"
+    assert supervisor.next_delay(40) == 5
+
+
+def test_timeout_kills_ffmpeg_and_cleans_up(tmp_path, images, monkeypatch):
+    fake_ffmpeg(tmp_path, monkeypatch, 'printf "half" > "$OUT"; sleep 30')
+    supervisor = capture.CaptureSupervisor("cam", "rtsp://x", str(images), timeout=1)
+    assert supervisor.capture() is None
+    assert os.listdir(images) == []
+    assert supervisor.health()["timeouts"] == 1
+
+
+def test_black_frame_is_flagged(tmp_path, images, monkeypatch):
+    fake_ffmpeg(tmp_path, monkeypatch, write_jpeg(0))
+    supervisor = capture.CaptureSupervisor("cam", "rtsp://x", str(images))
+    supervisor.capture()
+    assert supervisor.health()["status"] == "black"
@@ -0,0 +1,27 @@
+import pytest
+
+import db
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "test.db"))
+    db.init_db()
+
+
+def test_shadow_summary_ignores_unparsed_verdicts(temp_db):
+    db.mark_as_processed("a.jpg", "yes", answer="yes", parse_ok=True, latency_ms=100)
+    db.mark_as_processed("b.jpg", "no", answer="no", parse_ok=True, latency_ms=100)
+    db.mark_as_processed("c.jpg", "???", answer="unknown", parse_ok=False, latency_ms=100)
+    db.mark_as_processed("d.jpg", "Maybe = 40", answer="maybe")  # Row from before parse_ok existed
+    db.mark_shadow_result("a.jpg", "other", "yes", "yes", 0.9, True, 300)
+    db.mark_shadow_result("b.jpg", "other", "yes", "yes", 0.9, True, 300)
+    db.mark_shadow_result("c.jpg", "other", "???", "unknown", 0.0, False, 300)
+    db.mark_shadow_result("d.jpg", "other", "maybe", "maybe", 0.4, True, 300)
+
+    [summary] = db.shadow_summary()
+    assert summary["frames"] == 4
+    assert summary["compared"] == 3  # c.jpg: unknown on both sides is not agreement
+    assert summary["agreement"] == round(2 / 3, 4)
+    assert summary["parse_failures"] == 1
+    assert summary["avg_latency_ms"] == 300
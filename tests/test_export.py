@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+import sqlite3
+
+import pytest
+
+import db
+import export
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "test.db"))
+    db.init_db()
+
+
+def add_rows(rows):
+    """rows: (filename, timestamp, answer, confidence, camera)"""
+    with sqlite3.connect(db.DB_PATH) as conn:
+        conn.executemany(
+            "INSERT INTO processed(filename, timestamp, answer, confidence, camera, model, result) "
+            "VALUES (?, ?, ?, ?, ?, 'llava', ?)",
+            [row + (f"{row[2]} = {int(row[3] * 100)}",) for row in rows],
+        )
+
+
+@pytest.fixture
+def sample_rows(temp_db):
+    add_rows([
+        ("a.jpg", "2025-01-01 10:00:00", "yes", 0.8, "roof"),
+        ("b.jpg", "2025-01-02 10:00:00", "no", 0.0, "roof"),
+        ("c.jpg", "2025-01-03 10:00:00", "maybe", 0.4, "yard"),
+        ("d.jpg", "2025-01-04 10:00:00", "unknown", 0.0, "roof"),
+    ])
+
+
+def names(rows):
+    return [row["filename"] for row in rows]
+
+
+def test_iter_results_filters(sample_rows):
+    assert names(db.iter_results()) == ["a.jpg", "b.jpg", "c.jpg", "d.jpg"]
+    assert names(db.iter_results(start="2025-01-02 00:00:00", end="2025-01-03 10:00:00")) == ["b.jpg", "c.jpg"]
+    assert names(db.iter_results(answers=["yes", "maybe"])) == ["a.jpg", "c.jpg"]
+    assert names(db.iter_results(camera="roof", answers=["no", "unknown"])) == ["b.jpg", "d.jpg"]
+
+
+def test_parse_answers_expands_yesmaybe():
+    assert export.parse_answers(["yesmaybe", "No, unknown", ""]) == ["yes", "maybe", "no", "unknown"]
+
+
+def test_parse_datetime_accepts_date_and_datetime():
+    assert export.parse_datetime("2025-01-02") == "2025-01-02 00:00:00"
+    assert export.parse_datetime("2025-01-02T10:30") == "2025-01-02 10:30:00"
+    assert export.parse_datetime("") is None
+
+
+def test_csv_and_ndjson_round_trip(sample_rows):
+    text = "".join(export.export_rows("csv", answers=["yes", "maybe"]))
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert names(rows) == ["a.jpg", "c.jpg"]
+    assert list(rows[0]) == export.EXPORT_FIELDS
+
+    text = "".join(export.export_rows("ndjson", camera="yard"))
+    rows = [json.loads(line) for line in text.splitlines()]
+    assert names(rows) == ["c.jpg"]
+    assert rows[0]["confidence"] == 0.4
+
+
+def test_parquet_streams_one_row_group_per_chunk(temp_db):
+    pq = pytest.importorskip("pyarrow.parquet")
+    count = export.CHUNK_ROWS * 2 + 500
+    add_rows([(f"f{i:05d}.jpg", "2025-01-01 10:00:00", "no", 0.0, "roof") for i in range(count)])
+
+    data = b"".join(export.export_rows("parquet"))
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.num_rows == count
+    assert table.column_names == export.EXPORT_FIELDS
+    assert table.column("filename")[-1].as_py() == f"f{count - 1:05d}.jpg"
+
+
+@pytest.fixture
+def client(temp_db):
+    import main
+    return main.app.test_client()
+
+
+def test_export_route_streams_csv(client, sample_rows):
+    response = client.get("/export?format=csv&answer=yesmaybe&start=2025-01-02")
+    assert response.status_code == 200
+    assert response.headers["Content-Disposition"].endswith(".csv")
+    assert names(csv.DictReader(io.StringIO(response.get_data(as_text=True)))) == ["c.jpg"]
+
+
+@pytest.mark.parametrize("query", ["format=xml", "format=csv&start=yesterday", "format=csv&end=2025-13-01"])
+def test_export_route_rejects_bad_requests(client, query):
+    assert client.get(f"/export?{query}").status_code == 400
+
+
+def test_export_route_reports_missing_pyarrow(client, monkeypatch):
+    monkeypatch.setattr(export, "parquet_available", lambda: False)
+    response = client.get("/export?format=parquet")
+    assert response.status_code == 400
+    assert b"pyarrow" in response.data
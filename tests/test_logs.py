@@ -0,0 +1,49 @@
+import json
+import logging
+import logging.handlers
+import queue
+
+import logs
+
+
+def emit_through_queue(formatter, log):
+    """Send records through the same handler chain setup_logging() builds and return the output lines."""
+    records = []
+    output = logging.Handler()
+    output.emit = lambda record: records.append(output.format(record))
+    output.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, output)
+    logger = logging.getLogger("test_logs")
+    logger.propagate = False
+    handler = logs._QueueHandler(log_queue)
+    logger.addHandler(handler)
+    listener.start()
+    try:
+        log(logger)
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+    return records
+
+
+def test_json_keeps_exception_separate():
+    def log(logger):
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("boom %s", "here", extra={"image": "a.jpg"})
+
+    [line] = emit_through_queue(logs.JsonFormatter(), log)
+    entry = json.loads(line)
+    assert entry["msg"] == "boom here"
+    assert entry["image"] == "a.jpg"
+    assert "ZeroDivisionError" in entry["exc"]
+
+
+def test_rate_limit_counts_repeats():
+    limiter = logs.RateLimitFilter(window=60)
+    record = lambda: logging.LogRecord("x", logging.WARNING, "", 0, "FFmpeg failed %s", ("cam",), None)
+    assert limiter.filter(record())
+    assert not limiter.filter(record())
+    assert limiter.filter(logging.LogRecord("x", logging.INFO, "", 0, "FFmpeg failed %s", ("cam",), None))
@@ -0,0 +1,98 @@
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"answer": "yes", "confidence": 80}', ("yes", 0.8)),
+    ('{"answer": "Maybe", "confidence": 0}', ("maybe", 0.0)),
+    ('{"answer": "no", "confidence": 100.0}', ("no", 1.0)),
+])
+def test_parse_structured_accepts_schema(text, expected):
+    assert main.parse_structured(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "Yes = 80",
+    "[]",
+    '{"answer": "perhaps", "confidence": 10}',
+    '{"answer": "yes"}',
+    '{"answer": "yes", "confidence": 101}',
+    '{"answer": "yes", "confidence": true}',
+    '{"answer": "yes", "confidence": "80"}',
+])
+def test_parse_structured_rejects_malformed(text):
+    with pytest.raises(ValueError):
+        main.parse_structured(text)
+
+
+def test_parse_response_handles_both_formats():
+    assert main.parse_response("Yes = 65") == ("yes", 0.65)
+    assert main.parse_response('{"answer": "no", "confidence": 5}') == ("no", 0.05)
+    assert main.parse_response("I am not sure") == ("unknown", 0.0)
+
+
+def test_structured_retries_are_bounded_and_vary_seed(monkeypatch):
+    outputs = iter(["oops", '{"answer": "nope"}', '{"answer": "yes", "confidence": 70}'])
+    seeds = []
+
+    def fake_ask(image_b64, prompt, model=None, response_format=None, seed=None, keep_alive=None, timings=None):
+        assert response_format == main.RESPONSE_SCHEMA
+        seeds.append(seed)
+        return next(outputs)
+
+    monkeypatch.setattr(main, "OLLAMA_STRUCTURED", True)
+    monkeypatch.setattr(main, "OLLAMA_MAX_RETRIES", 2)
+    monkeypatch.setattr(main, "ask_llava_stream", fake_ask)
+    response, answer, confidence, attempts, parse_ok = main.ask_for_verdict("b64")
+    assert (answer, confidence, attempts, parse_ok) == ("yes", 0.7, 3, True)
+    assert len(set(seeds)) == 3
+
+
+def test_sampling_settings_go_in_options(monkeypatch):
+    sent = {}
+
+    class FakeResponse:
+        def raise_for_status(self):
+            pass
+
+        def iter_lines(self):
+            return [b'{"response": "No = 1", "done": true}']
+
+    def fake_post(url, json=None, **kwargs):
+        sent.update(json)
+        return FakeResponse()
+
+    monkeypatch.setattr(main.requests, "post", fake_post)
+    assert main.ask_llava_stream("b64", "prompt", seed=7) == "No = 1"
+    assert sent["options"]["seed"] == 7
+    assert "temperature" in sent["options"] and "temperature" not in sent
+
+
+@pytest.mark.parametrize("value, expected", [("-1", -1), ("3600", 3600), ("0", 0), ("24h", "24h")])
+def test_keep_alive_numbers_are_sent_as_ints(monkeypatch, value, expected):
+    sent = {}
+
+    class FakeResponse:
+        def raise_for_status(self):
+            pass
+
+        def iter_lines(self):
+            return [b'{"response": "No = 1", "done": true}']
+
+    def fake_post(url, json=None, **kwargs):
+        sent.update(json)
+        return FakeResponse()
+
+    monkeypatch.setattr(main.requests, "post", fake_post)
+    monkeypatch.setattr(main, "OLLAMA_KEEP_ALIVE", value)
+    main.ask_llava_stream("b64", "prompt")
+    assert sent["keep_alive"] == expected
+
+    main.ask_llava_stream("b64", "prompt", model="other", keep_alive=value)
+    assert sent["keep_alive"] == expected
+
+
+def test_inference_ms_leaves_out_model_load():
+    assert main.inference_ms({"total_duration": 9_000_000_000, "load_duration": 6_500_000_000}, 9100) == 2500
+    assert main.inference_ms({}, 9100) == 9100
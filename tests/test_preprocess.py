@@ -0,0 +1,61 @@
+import os
+import signal
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from PIL import Image
+
+import preprocess
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    path = tmp_path / "frame.png"
+    Image.new("RGBA", (64, 48), (200, 30, 30, 255)).save(path)
+    return str(path)
+
+
+@pytest.fixture
+def pool():
+    pool = preprocess.PreprocessPool(workers=1)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_matches_inline_payload(pool, image_path):
+    assert pool.encode(image_path) == preprocess.PreprocessPool(workers=0).encode(image_path)
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_unreadable_image_fails_its_future(tmp_path, workers):
+    path = tmp_path / "broken.jpg"
+    path.write_bytes(b"not a jpeg")
+    pool = preprocess.PreprocessPool(workers=workers)
+    pool.start()
+    try:
+        with pytest.raises(Exception):
+            pool.submit(str(path)).result(timeout=30)
+        with pytest.raises(FileNotFoundError):
+            pool.submit(str(tmp_path / "missing.jpg")).result(timeout=30)
+    finally:
+        pool.shutdown()
+
+
+def test_pool_restarts_after_worker_dies(pool, image_path):
+    expected = preprocess.encode_image_to_base64(image_path)
+    broken = pool._executor
+    for pid in list(broken._processes):
+        os.kill(pid, signal.SIGKILL)
+
+    # Jobs already in flight may fail with the pool; later submits get a fresh pool
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            assert pool.submit(image_path).result(timeout=30) == expected
+            break
+        except BrokenProcessPool:
+            assert time.monotonic() < deadline
+            time.sleep(0.1)
+    assert pool._executor is not broken
@@ -0,0 +1,95 @@
+import os
+
+import recovery
+
+
+def make_frames(folder, names):
+    for i, name in enumerate(names):
+        path = os.path.join(folder, name)
+        with open(path, "w"):
+            pass
+        os.utime(path, (1000 + i, 1000 + i))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_plan_is_newest_first(tmp_path):
+    make_frames(tmp_path, [f"f{i}.jpg" for i in range(5)] + ["notes.txt"])
+    planned, skipped = recovery.plan_recovery(str(tmp_path), {"f4.jpg"})
+    assert [name for _, name in planned] == ["f3.jpg", "f2.jpg", "f1.jpg", "f0.jpg"]
+    assert skipped == set()
+
+
+def test_plan_samples_older_gaps(tmp_path):
+    make_frames(tmp_path, [f"f{i}.jpg" for i in range(10)])
+    planned, skipped = recovery.plan_recovery(str(tmp_path), set(), full_count=3, sample_every=2)
+    assert [name for _, name in planned] == ["f9.jpg", "f8.jpg", "f7.jpg", "f6.jpg", "f4.jpg", "f2.jpg", "f0.jpg"]
+    assert skipped == {"f5.jpg", "f3.jpg", "f1.jpg"}
+
+
+def test_backlog_pops_newest_and_dedupes():
+    backlog = recovery.BacklogQueue([(1, "old.jpg")])
+    backlog.push("new.jpg", 5)
+    backlog.push("new.jpg", 5)
+    assert len(backlog) == 2
+    assert backlog.pop() == (5, "new.jpg")
+    assert backlog.pop() == (1, "old.jpg")
+    assert backlog.pop() is None
+
+
+def test_failing_newest_frame_does_not_starve_backlog(tmp_path):
+    # One corrupt newest frame and five valid older ones, driven like folder_watcher()
+    make_frames(tmp_path, [f"f{i}.jpg" for i in range(5)] + ["f9.jpg"])
+    clock = FakeClock()
+    processed = set()
+    planned, skipped = recovery.plan_recovery(str(tmp_path), processed)
+    backlog = recovery.BacklogQueue(planned)
+    retries = recovery.RetryTracker(max_attempts=3, retry_delay=30, clock=clock)
+    analyzed = []
+
+    for _ in range(50):
+        for mtime, name in recovery.scan_unprocessed(str(tmp_path), processed, skipped, backlog, retries):
+            backlog.push(name, mtime)
+        item = backlog.pop()
+        if item is None:
+            clock.now += 30
+            continue
+        name = item[1]
+        analyzed.append(name)
+        if name == "f9.jpg":
+            retries.record_failure(name)
+        else:
+            processed.add(name)
+            retries.record_success(name)
+
+    assert processed == {f"f{i}.jpg" for i in range(5)}
+    assert analyzed.count("f9.jpg") == 3
+    assert retries.given_up == {"f9.jpg"}
+
+
+def test_retry_backoff_doubles():
+    clock = FakeClock()
+    retries = recovery.RetryTracker(max_attempts=5, retry_delay=10, clock=clock)
+    assert retries.record_failure("a.jpg")
+    assert "a.jpg" in retries
+    clock.now = 10
+    assert "a.jpg" not in retries
+    retries.record_failure("a.jpg")
+    clock.now = 29
+    assert "a.jpg" in retries
+    clock.now = 30
+    assert "a.jpg" not in retries
+
+
+def test_expired_frames_stay_out_of_plan_and_rescans(tmp_path):
+    make_frames(tmp_path, ["old.jpg", "new.jpg"])  # mtimes 1000 and 1001
+    planned, skipped = recovery.plan_recovery(str(tmp_path), set(), min_mtime=1001)
+    assert planned == [(1001, "new.jpg")]
+    backlog = recovery.BacklogQueue(planned)
+    assert recovery.scan_unprocessed(str(tmp_path), set(), skipped, backlog, min_mtime=1001) == []
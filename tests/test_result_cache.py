@@ -0,0 +1,58 @@
+from result_cache import ResultCache
+
+
+def parse(text):
+    answer, _, confidence = text.partition("=")
+    return answer.strip().lower() or "unknown", int(confidence or 0) / 100.0
+
+
+class FakeLoader:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def __call__(self, filenames):
+        self.calls.append(list(filenames))
+        return {f: self.rows[f] for f in filenames if f in self.rows}
+
+
+def test_put_stores_compact_record():
+    cache = ResultCache(FakeLoader({}), parse)
+    record = cache.put("a.jpg", "yes", 0.8)
+    assert (record.answer, record.confidence, record.error) == ("yes", 0.8, None)
+    assert cache.get("a.jpg") == record
+
+
+def test_misses_load_compact_columns_in_one_batch():
+    loader = FakeLoader({
+        "a.jpg": ("no", 0.1, "2025-01-01 10:00:00", None),
+        "b.jpg": (None, None, "2025-01-01 10:01:00", "Maybe = 40"),  # not backfilled yet
+    })
+    cache = ResultCache(loader, parse)
+    records = cache.get_many(["a.jpg", "b.jpg", "missing.jpg"])
+    assert loader.calls == [["a.jpg", "b.jpg", "missing.jpg"]]
+    assert records["a.jpg"].answer == "no"
+    assert (records["b.jpg"].answer, records["b.jpg"].confidence) == ("maybe", 0.4)
+    assert "missing.jpg" not in records
+    # Second lookup is served from memory
+    cache.get_many(["a.jpg", "b.jpg"])
+    assert len(loader.calls) == 1
+
+
+def test_size_is_bounded_lru():
+    cache = ResultCache(FakeLoader({}), parse, max_entries=2)
+    cache.put("a.jpg", "yes", 0.01)
+    cache.put("b.jpg", "yes", 0.02)
+    cache.get("a.jpg")  # a becomes most recent
+    cache.put("c.jpg", "yes", 0.03)
+    assert len(cache) == 2
+    assert cache.get("b.jpg") is None
+    assert cache.get("a.jpg") is not None
+
+
+def test_errors_and_discard():
+    cache = ResultCache(FakeLoader({}), parse)
+    cache.put_error("a.jpg", "boom")
+    assert cache.get("a.jpg").error == "boom"
+    cache.discard(["a.jpg"])
+    assert cache.get("a.jpg") is None